@@ -1,46 +1,39 @@
 import os
 import sys
+import argparse
+import atexit
+import io
 import json
 import logging
+import logging.handlers
+import queue
 import sqlite3
-import subprocess
-import shutil
 import datetime
 from typing import Optional, Dict, Any
 
+try:
+    import orjson  # optional: C/SIMD JSON for import/export paths
+except ImportError:
+    orjson = None
+
+try:
+    import ijson  # optional: streaming parse for import_json
+except ImportError:
+    ijson = None
+
 
 def export_db_to_vault(vault_file: str):
-    """Export all secrets to a JSON file and encrypt it with Ansible vault."""
-    import tempfile
+    """Export all secrets to JSON in memory and encrypt them with Ansible vault."""
+    import vault
 
     try:
-        with tempfile.NamedTemporaryFile("w", delete=False) as tmp:
-            export_db_to_json(tmp.name)
-            tmp.flush()
-            password = os.getenv("VAULT_PASSWORD")
-            if not password:
-                import getpass
-
-                password = getpass.getpass("Vault password: ")
-            proc = subprocess.run(
-                [
-                    "ansible-vault",
-                    "encrypt",
-                    tmp.name,
-                    "--output",
-                    vault_file,
-                    "--vault-password-file",
-                    "-",
-                ],
-                input=password.encode(),
-                capture_output=True,
-            )
-            if proc.returncode != 0:
-                logger.error(f"Vault encryption failed: {proc.stderr.decode().strip()}")
-                print("Error: Vault encryption failed. See log for details.")
-                os.unlink(tmp.name)
-                return
-        os.unlink(tmp.name)
+        plaintext = _export_db_to_bytes()
+        try:
+            vault.vault_encrypt(plaintext, vault_path=vault_file)
+        except Exception as e:
+            logger.error(f"Vault encryption failed: {e}")
+            print("Error: Vault encryption failed. See log for details.")
+            return
         logger.info(
             f"Exported and encrypted database to {vault_file}. No secrets or passwords logged."
         )
@@ -51,32 +44,19 @@ def export_db_to_vault(vault_file: str):
 
 
 def import_db_from_vault(vault_file: str):
-    """Decrypt an Ansible vault file and import its contents into the database."""
-    import tempfile
+    """Decrypt an Ansible vault file in memory and import its contents into the database."""
+    import vault
 
     try:
-        password = os.getenv("VAULT_PASSWORD")
-        if not password:
-            import getpass
-
-            password = getpass.getpass("Vault password: ")
-        with tempfile.NamedTemporaryFile("w", delete=False) as tmp:
-            proc = subprocess.run(
-                ["ansible-vault", "view", vault_file, "--vault-password-file", "-"],
-                input=password.encode(),
-                capture_output=True,
-            )
-            if proc.returncode != 0:
-                logger.error(f"Vault decryption failed: {proc.stderr.decode().strip()}")
-                print("Error: Vault decryption failed. See log for details.")
-                os.unlink(tmp.name)
-                return
-            tmp.write(proc.stdout.decode())
-            tmp.flush()
-            init_db()
-            import_db_from_json(tmp.name)
-        os.unlink(tmp.name)
-        logger.info(f"Decrypted and imported database from {vault_file}.")
+        try:
+            plaintext = vault.vault_decrypt(vault_path=vault_file)
+        except vault.VaultError as e:
+            logger.error(f"Vault decryption failed: {e}")
+            print("Error: Vault decryption failed. See log for details.")
+            return
+        init_db()
+        count = _import_db_from_bytes(plaintext)
+        logger.info(f"Decrypted and imported {count} records from {vault_file}.")
         print("Decrypted and imported database from {}.".format(vault_file))
     except Exception as e:
         logger.error(f"Vault import error: {e}")
@@ -88,17 +68,54 @@ stordb.py - Secure Hardware & Secrets Database
 """
 
 
+# Background thread that performs stordb.log writes for the active logger setup
+_log_listener = None
+
+
+def _start_log_listener(file_handler, formatter):
+    """Run file_handler on a QueueListener thread; return the QueueHandler that feeds it."""
+    global _log_listener
+    file_handler.setFormatter(formatter)
+    log_queue = queue.SimpleQueue()
+    _log_listener = logging.handlers.QueueListener(log_queue, file_handler)
+    _log_listener.start()
+    return logging.handlers.QueueHandler(log_queue)
+
+
+def _stop_log_listener():
+    """Flush and stop the log listener thread, closing its file handler."""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        for handler in _log_listener.handlers:
+            handler.close()
+        _log_listener = None
+
+
+atexit.register(_stop_log_listener)
+
+
+# Debug flag of the active setup_logger configuration (None until configured)
+_logger_debug = None
+
+
 def setup_logger(debug=False):
+    """Configure the stordb logger; repeat calls with the same mode are no-ops."""
+    global _logger_debug
     logger = logging.getLogger("stordb")
+    if debug == _logger_debug and logger.handlers:
+        return logger
     logger.setLevel(logging.DEBUG if debug else logging.INFO)
     logger.handlers.clear()
+    _stop_log_listener()
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
     if debug:
         handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(formatter)
     else:
-        handler = logging.FileHandler("stordb.log")
-    formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
-    handler.setFormatter(formatter)
+        handler = _start_log_listener(logging.FileHandler("stordb.log", delay=True), formatter)
     logger.addHandler(handler)
+    _logger_debug = debug
     return logger
 
 
@@ -107,47 +124,188 @@ logger = setup_logger(debug=False)
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS secrets (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
-    mac_address TEXT,
-    device_name TEXT,
-    owner TEXT,
+    mac_address TEXT NOT NULL CHECK (length(mac_address) > 0),
+    device_name TEXT NOT NULL CHECK (length(device_name) > 0),
+    owner TEXT NOT NULL CHECK (length(owner) > 0),
     notes TEXT,
     secret_type TEXT,
     secret_value TEXT
 );
+CREATE INDEX IF NOT EXISTS idx_secrets_mac ON secrets(mac_address);
+CREATE INDEX IF NOT EXISTS idx_secrets_device ON secrets(device_name);
+CREATE INDEX IF NOT EXISTS idx_secrets_owner ON secrets(owner);
 """
 
+_INSERT_SECRET_SQL = (
+    "INSERT INTO secrets (mac_address, device_name, owner, notes, secret_type, secret_value) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+
+# Bulk insert of a JSON array of records bound as a single parameter
+_INSERT_SECRETS_JSON_SQL = (
+    "INSERT INTO secrets (mac_address, device_name, owner, notes, secret_type, secret_value) "
+    "SELECT json_extract(value, '$.mac_address'), json_extract(value, '$.device_name'), "
+    "json_extract(value, '$.owner'), coalesce(json_extract(value, '$.notes'), ''), "
+    "coalesce(json_extract(value, '$.secret_type'), 'mac'), "
+    "coalesce(json_extract(value, '$.secret_value'), '') FROM json_each(?)"
+)
+
+_SELECT_SECRETS_SQL = (
+    "SELECT id, mac_address, device_name, owner, notes, secret_type, secret_value FROM secrets"
+)
+
+# Prepared lookup statements for the columns lookup_secrets_by_field may filter on
+_LOOKUP_SQL = {
+    field: f"{_SELECT_SECRETS_SQL} WHERE {field} = ?"
+    for field in ("mac_address", "device_name", "owner", "secret_type")
+}
+
+# Columns update_secret may set, and its UPDATE statements keyed by column tuple
+_UPDATE_FIELDS = frozenset(
+    {"mac_address", "device_name", "owner", "notes", "secret_type", "secret_value"}
+)
+_update_sql_cache = {}
+
+
+def _json_loads(data):
+    """Parse JSON text or bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj) -> bytes:
+    """Serialize obj to compact UTF-8 JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+# Database files already switched to WAL; journal_mode is persistent per file.
+_wal_initialized = set()
+
+# Open connections keyed by database path, reused across calls.
+_conn_cache = {}
+
+# The cached connection per path that has already run SCHEMA. A different
+# connection for the path (reopened, or after restore_db) runs it again.
+_inited_conns = {}
+
+
+def _connect(db_path: str):
+    """Open a SQLite connection tuned for WAL and low fsync overhead."""
+    conn = sqlite3.connect(
+        db_path, isolation_level=None, check_same_thread=False, cached_statements=128
+    )
+    conn.row_factory = sqlite3.Row
+    if db_path != ":memory:" and db_path not in _wal_initialized:
+        conn.execute("PRAGMA journal_mode=WAL;")
+        _wal_initialized.add(db_path)
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    conn.execute("PRAGMA cache_size=-65536;")
+    conn.execute("PRAGMA busy_timeout=5000;")
+    conn.execute("PRAGMA mmap_size=268435456;")
+    return conn
+
 
 def get_db_connection(db_path: str = None):
-    """Get a SQLite database connection."""
+    """Get the shared SQLite connection for db_path, opening it on first use."""
     try:
         if db_path is None:
             db_path = os.getenv("STORDB_DB_PATH", "stordb.sqlite3")
-        return sqlite3.connect(db_path)
+        conn = _conn_cache.get(db_path)
+        if conn is None:
+            conn = _conn_cache[db_path] = _connect(db_path)
+        return conn
     except Exception as e:
         logger.error(f"Database connection error: {e}")
         print(f"Error: Could not connect to database: {e}")
         raise
 
 
+def close_db_connection(db_path: str = None):
+    """Close and forget the shared connection for db_path, if one is open."""
+    if db_path is None:
+        db_path = os.getenv("STORDB_DB_PATH", "stordb.sqlite3")
+    _inited_conns.pop(db_path, None)
+    conn = _conn_cache.pop(db_path, None)
+    if conn is not None:
+        conn.close()
+
+
+def _close_all_db_connections():
+    for conn in _conn_cache.values():
+        conn.close()
+    _conn_cache.clear()
+    _inited_conns.clear()
+
+
+atexit.register(_close_all_db_connections)
+
+
 def init_db(db_path: str = None):
-    """Initialize the database schema if not present."""
+    """Initialize the database schema if not present.
+
+    Repeat calls on the same open connection skip the schema script.
+    """
+    if db_path is None:
+        db_path = os.getenv("STORDB_DB_PATH", "stordb.sqlite3")
     conn = get_db_connection(db_path)
-    conn.execute(SCHEMA)
-    conn.commit()
-    conn.close()
+    if _inited_conns.get(db_path) is conn:
+        return
+    conn.executescript(SCHEMA)
+    _inited_conns[db_path] = conn
+
+
+_REQUIRED_FIELDS = ("mac_address", "device_name", "owner")
+
+
+def _secret_row(entry):
+    """Map a validated JSON record to an _INSERT_SECRET_SQL parameter tuple."""
+    return (
+        entry["mac_address"],
+        entry["device_name"],
+        entry["owner"],
+        entry.get("notes", ""),
+        entry.get("secret_type", "mac"),
+        entry.get("secret_value", ""),
+    )
+
+
+def _missing_required(values) -> list:
+    """Return the names of required fields whose value is missing or empty.
+
+    values are the mac_address, device_name, owner values in that order.
+    Databases created before the NOT NULL/CHECK constraints were added
+    still have the old table definition, so this check cannot be left to
+    the schema.
+    """
+    return [name for name, value in zip(_REQUIRED_FIELDS, values) if not value]
+
+
+def _validate_record(i, entry):
+    """Raise ValueError unless entry is a JSON object with every required field."""
+    if not isinstance(entry, dict):
+        raise ValueError(f"Record {i} is not a JSON object.")
+    missing = _missing_required([entry.get(name) for name in _REQUIRED_FIELDS])
+    if missing:
+        raise ValueError(f"Record {i} missing required fields: {', '.join(missing)}")
+
+
+def _validated_records(records):
+    """Yield records after checking each one like validate_json_input does."""
+    for i, entry in enumerate(records):
+        _validate_record(i, entry)
+        yield entry
 
 
 def validate_json_input(data):
     """Validate imported JSON data for required fields."""
     if not isinstance(data, list):
         raise ValueError("JSON input must be a list of records.")
-    required = {"mac_address", "device_name", "owner"}
     for i, entry in enumerate(data):
-        missing = required - set(entry.keys())
-        if missing:
-            raise ValueError(
-                f"Record {i} missing required fields: {', '.join(missing)}"
-            )
+        _validate_record(i, entry)
 
 
 def usage():
@@ -180,7 +338,13 @@ def backup_db(backup_path: str = None, db_path: str = None):
         ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_path = f"{db_path}.backup_{ts}"
     try:
-        shutil.copy2(db_path, backup_path)
+        # Online backup API: consistent under concurrent writers and WAL
+        src = get_db_connection(db_path)
+        dst = sqlite3.connect(backup_path)
+        try:
+            src.backup(dst, pages=1024)
+        finally:
+            dst.close()
         logger.info(f"DB BACKUP: {db_path} -> {backup_path}")
         print(f"Database backed up to {backup_path}.")
     except Exception as e:
@@ -196,7 +360,15 @@ def restore_db(backup_path: str, db_path: str = None):
         print(f"Error: Backup file {backup_path} does not exist.")
         return
     try:
-        shutil.copy2(backup_path, db_path)
+        # Copy pages into the live database rather than replacing the file
+        # underneath open connections and their WAL
+        src = sqlite3.connect(backup_path)
+        try:
+            src.backup(get_db_connection(db_path), pages=1024)
+        finally:
+            src.close()
+        # The restored pages bring the backup's schema; let init_db check it again
+        _inited_conns.pop(db_path, None)
         logger.info(f"DB RESTORE: {backup_path} -> {db_path}")
         print(f"Database restored from {backup_path} to {db_path}.")
     except Exception as e:
@@ -204,20 +376,6 @@ def restore_db(backup_path: str, db_path: str = None):
         print(f"Error: Could not restore database: {e}")
 
 
-def setup_logger(debug=False):
-    logger = logging.getLogger("stordb")
-    logger.setLevel(logging.DEBUG if debug else logging.INFO)
-    logger.handlers.clear()
-    if debug:
-        handler = logging.StreamHandler(sys.stdout)
-    else:
-        handler = logging.FileHandler("stordb.log")
-    formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
-    return logger
-
-
 def add_secret(
     mac_address: str,
     device_name: str,
@@ -226,6 +384,7 @@ def add_secret(
     secret_type: str = "mac",
     secret_value: str = "",
     db_path: str = None,
+    conn: Optional[sqlite3.Connection] = None,
 ):
     # Validate required fields
     if not mac_address:
@@ -238,13 +397,13 @@ def add_secret(
         logger.warning("Add secret failed: owner is required")
         raise ValueError("owner is required")
     try:
-        conn = get_db_connection(db_path)
+        if conn is None:
+            conn = get_db_connection(db_path)
         conn.execute(
-            "INSERT INTO secrets (mac_address, device_name, owner, notes, secret_type, secret_value) VALUES (?, ?, ?, ?, ?, ?)",
+            _INSERT_SECRET_SQL,
             (mac_address, device_name, owner, notes, secret_type, secret_value),
         )
         conn.commit()
-        conn.close()
         logger.info(
             f"DB TRANSACTION: add_secret device_name='{device_name}', owner='{owner}', secret_type='{secret_type}', mac_address='[REDACTED]', secret_value='[REDACTED]', id=[auto]"
         )
@@ -254,48 +413,153 @@ def add_secret(
         raise
 
 
+def add_secrets(
+    rows,
+    db_path: str = None,
+    conn: Optional[sqlite3.Connection] = None,
+) -> int:
+    """Insert many secrets in one transaction; return the count.
+
+    Each row is a (mac_address, device_name, owner, notes, secret_type,
+    secret_value) tuple. A row missing a required field rolls back the
+    whole batch and is raised as a ValueError naming the offending record.
+    """
+    if conn is None:
+        conn = get_db_connection(db_path)
+
+    def checked():
+        for i, row in enumerate(rows):
+            missing = _missing_required(row[:3])
+            if missing:
+                raise ValueError(f"Record {i} missing required fields: {', '.join(missing)}")
+            yield row
+
+    try:
+        count = _insert_secret_rows(conn, checked())
+    except Exception as e:
+        logger.error(f"DB TRANSACTION ERROR: add_secrets, error={e}")
+        raise
+    logger.info(f"DB TRANSACTION: add_secrets inserted {count} records")
+    return count
+
+
+def _begin_batch(conn):
+    """Open the transaction for a batch insert, refusing to join one already open.
+
+    Rolling back a failed batch would otherwise discard the caller's own
+    uncommitted work on conn.
+    """
+    if conn.in_transaction:
+        raise sqlite3.OperationalError("batch insert needs a connection with no open transaction")
+    conn.execute("BEGIN")
+
+
+def _insert_secret_rows(conn, rows) -> int:
+    """Insert already-validated parameter tuples in one transaction; return the count."""
+    count = 0
+
+    def counted():
+        nonlocal count
+        for row in rows:
+            yield row
+            count += 1
+
+    _begin_batch(conn)
+    try:
+        conn.executemany(_INSERT_SECRET_SQL, counted())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return count
+
+
 def lookup_secret(
     mac_address: Optional[str] = None,
     device_name: Optional[str] = None,
     db_path: str = None,
+    conn: Optional[sqlite3.Connection] = None,
 ) -> Optional[Dict[str, Any]]:
-    conn = get_db_connection(db_path)
+    if conn is None:
+        conn = get_db_connection(db_path)
     cursor = conn.cursor()
     if mac_address:
-        cursor.execute("SELECT * FROM secrets WHERE mac_address = ?", (mac_address,))
+        cursor.execute(_LOOKUP_SQL["mac_address"], (mac_address,))
     elif device_name:
-        cursor.execute("SELECT * FROM secrets WHERE device_name = ?", (device_name,))
+        cursor.execute(_LOOKUP_SQL["device_name"], (device_name,))
     else:
-        conn.close()
         return None
     row = cursor.fetchone()
-    conn.close()
     if row:
-        return dict(zip([d[0] for d in cursor.description], row))
+        return dict(row)
     return None
 
 
-def lookup_secrets_by_field(field: str, value: str, db_path: str = None):
-    conn = get_db_connection(db_path)
-    cursor = conn.cursor()
-    query = f"SELECT * FROM secrets WHERE {field} = ?"
-    cursor.execute(query, (value,))
-    rows = cursor.fetchall()
-    conn.close()
-    results = []
-    for row in rows:
-        results.append(dict(zip([d[0] for d in cursor.description], row)))
-    return results
+def lookup_secrets_by_field(
+    field: str,
+    value: str,
+    db_path: str = None,
+    conn: Optional[sqlite3.Connection] = None,
+):
+    query = _LOOKUP_SQL.get(field)
+    if query is None:
+        logger.warning(f"Lookup failed: unsupported field '{field}'")
+        raise ValueError(f"Unsupported lookup field: {field}")
+    if conn is None:
+        conn = get_db_connection(db_path)
+    return [dict(row) for row in conn.execute(query, (value,))]
 
 
-def update_secret(id: int, updates: Dict[str, Any], db_path: str = None):
-    try:
+def lookup_secrets(
+    mac_address: Optional[str] = None,
+    owner: Optional[str] = None,
+    device_name: Optional[str] = None,
+    db_path: str = None,
+    conn: Optional[sqlite3.Connection] = None,
+):
+    """Return every secret matching any of the given fields, in one query."""
+    criteria = [
+        (field, value)
+        for field, value in (
+            ("mac_address", mac_address),
+            ("owner", owner),
+            ("device_name", device_name),
+        )
+        if value
+    ]
+    if not criteria:
+        return []
+    where = " OR ".join(f"{field} = ?" for field, _ in criteria)
+    if conn is None:
         conn = get_db_connection(db_path)
-        fields = ", ".join([f"{k} = ?" for k in updates.keys()])
-        values = list(updates.values()) + [id]
-        conn.execute(f"UPDATE secrets SET {fields} WHERE id = ?", values)
+    rows = conn.execute(
+        f"{_SELECT_SECRETS_SQL} WHERE {where} ORDER BY id",
+        [value for _, value in criteria],
+    )
+    return [dict(row) for row in rows]
+
+
+def update_secret(
+    id: int,
+    updates: Dict[str, Any],
+    db_path: str = None,
+    conn: Optional[sqlite3.Connection] = None,
+):
+    try:
+        if not updates:
+            raise ValueError("No fields to update")
+        unknown = set(updates) - _UPDATE_FIELDS
+        if unknown:
+            raise ValueError(f"Unsupported update fields: {', '.join(sorted(unknown))}")
+        cols = tuple(sorted(updates))
+        sql = _update_sql_cache.get(cols)
+        if sql is None:
+            fields = ", ".join(f"{c} = ?" for c in cols)
+            sql = _update_sql_cache[cols] = f"UPDATE secrets SET {fields} WHERE id = ?"
+        if conn is None:
+            conn = get_db_connection(db_path)
+        conn.execute(sql, [updates[c] for c in cols] + [id])
         conn.commit()
-        conn.close()
         safe_updates = {k: ("[REDACTED]" if k in ("secret_value", "mac_address") else v) for k, v in updates.items()}
         logger.info(f"DB TRANSACTION: update_secret id={id}, updates={safe_updates}")
     except Exception as e:
@@ -304,12 +568,14 @@ def update_secret(id: int, updates: Dict[str, Any], db_path: str = None):
         raise
 
 
-def delete_secret(id: int, db_path: str = None):
+def delete_secret(
+    id: int, db_path: str = None, conn: Optional[sqlite3.Connection] = None
+):
     try:
-        conn = get_db_connection(db_path)
+        if conn is None:
+            conn = get_db_connection(db_path)
         conn.execute("DELETE FROM secrets WHERE id = ?", (id,))
         conn.commit()
-        conn.close()
         logger.info(f"DB TRANSACTION: delete_secret id={id}")
     except Exception as e:
         logger.error(f"DB TRANSACTION ERROR: delete_secret id={id}, error={e}")
@@ -320,84 +586,122 @@ def delete_secret(id: int, db_path: str = None):
 def import_json(json_file: str, db_path: str = None):
     logger.info(f"UI ACTION: import_json requested from {json_file}")
     try:
-        with open(json_file, "r") as f:
-            data = json.load(f)
+        f = open(json_file, "rb")
     except Exception as e:
         logger.error(f"JSON load error in {json_file}: {e}")
         print(f"Error: Could not load JSON in {json_file}: {e}")
         return
-    try:
-        validate_json_input(data)
-    except Exception as e:
-        logger.error(f"JSON validation failed: {e}")
-        print(f"Error: {e}")
-        return
-    count = 0
-    for entry in data:
+    with f:
+        if ijson is not None and f.peek(64).lstrip()[:1] == b"[":
+            # Stream one record at a time; the insert consumes it lazily, so
+            # memory stays flat and a parse or validation error rolls back.
+            data = _validated_records(ijson.items(f, "item", use_float=True))
+        else:
+            try:
+                data = _json_loads(f.read())
+            except Exception as e:
+                logger.error(f"JSON load error in {json_file}: {e}")
+                print(f"Error: Could not load JSON in {json_file}: {e}")
+                return
+            try:
+                validate_json_input(data)
+            except Exception as e:
+                logger.error(f"JSON validation failed: {e}")
+                print(f"Error: {e}")
+                return
         try:
-            mac = entry.get("mac_address", "")
-            name = entry.get("device_name", "")
-            owner = entry.get("owner", "")
-            notes = entry.get("notes", "")
-            secret_type = entry.get("secret_type", "mac")
-            secret_value = entry.get("secret_value", "")
-            add_secret(mac, name, owner, notes, secret_type, secret_value, db_path=db_path)
-            count += 1
+            count = _insert_secret_rows(
+                get_db_connection(db_path), (_secret_row(entry) for entry in data)
+            )
+        except ValueError as e:
+            # Raised by _validated_records for a bad streamed record
+            logger.error(f"JSON validation failed: {e}")
+            print(f"Error: {e}")
+            return
         except Exception as e:
-            logger.error(f"DB TRANSACTION ERROR: import_json record device_name='{name}', owner='{owner}', error={e}")
-            print(f"Error: Could not import record: {e}")
+            logger.error(f"DB TRANSACTION ERROR: import_json from {json_file}, error={e}")
+            print(f"Error: Could not import records: {e}")
+            return
     logger.info(f"DB TRANSACTION: import_json imported {count} records from {json_file}")
     print(f"Imported {count} records from {json_file}.")
 
 
+_EXPORT_BUFFER_SIZE = 1 << 20
+
+
+def _export_records(db_path: str = None):
+    """Yield each secret as compact JSON object bytes."""
+    conn = get_db_connection(db_path)
+    for row in conn.execute(_SELECT_SECRETS_SQL):
+        yield _json_dumps(dict(row))
+
+
+def _write_json_array(f, records) -> int:
+    """Write JSON object bytes to f as an array, one per line; return the count."""
+    count = 0
+    f.write(b"[")
+    for record in records:
+        f.write(b",\n  " if count else b"\n  ")
+        f.write(record)
+        count += 1
+    f.write(b"\n]\n" if count else b"]\n")
+    return count
+
+
+def _export_db_to_bytes(db_path: str = None) -> bytes:
+    """Serialize all secrets to JSON bytes without touching the filesystem."""
+    buf = io.BytesIO()
+    _write_json_array(buf, _export_records(db_path))
+    return buf.getvalue()
+
+
 def export_db_to_json(json_file: str, db_path: str = None):
     """Export all secrets from the database to a JSON file."""
     logger.info(f"UI ACTION: export_db_to_json requested to {json_file}")
     try:
-        conn = get_db_connection(db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM secrets")
-        rows = cursor.fetchall()
-        columns = [desc[0] for desc in cursor.description]
-        data = [dict(zip(columns, row)) for row in rows]
-        conn.close()
-        with open(json_file, "w") as f:
-            json.dump(data, f, indent=2)
-        logger.info(f"DB TRANSACTION: export_db_to_json exported {len(data)} records to {json_file}")
-        print(f"Exported {len(data)} records to {json_file}.")
+        # Owner-only permissions for a plaintext secrets file; 1 MiB buffered writes
+        fd = os.open(json_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            f = open(fd, "wb", buffering=_EXPORT_BUFFER_SIZE)
+        except Exception:
+            os.close(fd)
+            raise
+        with f:
+            # Stream records to the file instead of materializing the table
+            count = _write_json_array(f, _export_records(db_path))
+        logger.info(f"DB TRANSACTION: export_db_to_json exported {count} records to {json_file}")
+        print(f"Exported {count} records to {json_file}.")
     except Exception as e:
         logger.error(f"DB TRANSACTION ERROR: export_db_to_json to {json_file}, error={e}")
         print(f"Error: Could not export to JSON: {e}")
         raise
 
 
+def _import_db_from_bytes(data: bytes, db_path: str = None) -> int:
+    """Validate JSON bytes and insert their records in one transaction; return the count."""
+    records = _json_loads(data)
+    validate_json_input(records)
+    payload = _json_dumps(records).decode()
+    conn = get_db_connection(db_path)
+    _begin_batch(conn)
+    try:
+        # One statement and one bound parameter for the whole batch
+        conn.execute(_INSERT_SECRETS_JSON_SQL, (payload,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(records)
+
+
 def import_db_from_json(json_file: str, db_path: str = None):
     """Import secrets from a JSON file into the database."""
     logger.info(f"UI ACTION: import_db_from_json requested from {json_file}")
     try:
-        with open(json_file, "r") as f:
-            data = json.load(f)
-        validate_json_input(data)
-        conn = get_db_connection(db_path)
-        for entry in data:
-            try:
-                mac = entry.get("mac_address", "")
-                name = entry.get("device_name", "")
-                owner = entry.get("owner", "")
-                notes = entry.get("notes", "")
-                secret_type = entry.get("secret_type", "mac")
-                secret_value = entry.get("secret_value", "")
-                conn.execute(
-                    "INSERT INTO secrets (mac_address, device_name, owner, notes, secret_type, secret_value) VALUES (?, ?, ?, ?, ?, ?)",
-                    (mac, name, owner, notes, secret_type, secret_value),
-                )
-            except Exception as e:
-                logger.error(f"DB TRANSACTION ERROR: import_db_from_json record device_name='{name}', owner='{owner}', error={e}")
-                print(f"Error: Could not import record: {e}")
-        conn.commit()
-        conn.close()
-        logger.info(f"DB TRANSACTION: import_db_from_json imported {len(data)} records from {json_file}")
-        print(f"Imported {len(data)} records from {json_file}.")
+        with open(json_file, "rb") as f:
+            count = _import_db_from_bytes(f.read(), db_path)
+        logger.info(f"DB TRANSACTION: import_db_from_json imported {count} records from {json_file}")
+        print(f"Imported {count} records from {json_file}.")
     except Exception as e:
         logger.error(f"DB TRANSACTION ERROR: import_db_from_json from {json_file}, error={e}")
         print(f"Error: Could not import from JSON: {e}")
@@ -405,8 +709,6 @@ def import_db_from_json(json_file: str, db_path: str = None):
 
 
 def main():
-    import argparse
-
     parser = argparse.ArgumentParser(
         description="stordb: Secure Hardware & Secrets Database"
     )
@@ -467,6 +769,12 @@ def main():
     logger = setup_logger(debug=args.debug)
     logger.info(f"UI ACTION: CLI started with args: {sys.argv[1:]}")
 
+    # Open the database once for record commands; the other commands reach the
+    # same shared connection through get_db_connection()
+    conn = None
+    if args.add or args.lookup or args.owner or args.device or args.delete or args.update:
+        conn = get_db_connection()
+
     if args.init:
         logger.info("UI ACTION: --init requested")
         init_db()
@@ -481,38 +789,29 @@ def main():
     elif args.add:
         mac, name, owner, notes = args.add
         logger.info(f"UI ACTION: --add requested for device_name={name}, owner={owner}")
-        add_secret(mac, name, owner, notes)
+        add_secret(mac, name, owner, notes, conn=conn)
         print(json.dumps({"status": f"Added device {name}."}, indent=2))
     elif args.lookup or args.owner or args.device:
         logger.info(f"UI ACTION: --lookup/--owner/--device requested")
-        results = []
-        if args.lookup:
-            res = lookup_secret(mac_address=args.lookup)
-            if res:
-                results.append(res)
-        if args.owner:
-            results += lookup_secrets_by_field("owner", args.owner)
-        if args.device:
-            results += lookup_secrets_by_field("device_name", args.device)
-        seen = set()
-        deduped = []
-        for r in results:
-            if r and r.get("id") not in seen:
-                deduped.append(dict(r))
-                seen.add(r.get("id"))
-        if deduped:
-            print(json.dumps(deduped, indent=2))
+        results = lookup_secrets(
+            mac_address=args.lookup,
+            owner=args.owner,
+            device_name=args.device,
+            conn=conn,
+        )
+        if results:
+            print(json.dumps(results, indent=2))
         else:
             print(json.dumps({"status": "Not found."}, indent=2))
     elif args.delete:
         logger.info(f"UI ACTION: --delete requested for id={args.delete}")
-        delete_secret(args.delete)
+        delete_secret(args.delete, conn=conn)
         print(json.dumps({"status": f"Deleted device with ID {args.delete}."}, indent=2))
     elif args.update:
         id, fieldval = args.update
         field, val = fieldval.split("=", 1)
         logger.info(f"UI ACTION: --update requested for id={id}, field={field}")
-        update_secret(int(id), {field: val})
+        update_secret(int(id), {field: val}, conn=conn)
         print(json.dumps({"status": f"Updated device {id}: {field} -> {val}"}, indent=2))
     elif args.import_json:
         logger.info(f"UI ACTION: --import-json requested from {args.import_json}")
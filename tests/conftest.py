@@ -1,8 +1,93 @@
 import os
+import logging
+import logging.handlers
 import pytest
+import stordb
 import vault
 
+_real_get_vault_password = vault.get_vault_password
+
 @pytest.fixture(autouse=True)
 def patch_vault_password(monkeypatch):
-    os.environ["VAULT_PASSWORD"] = "testpass"
+    monkeypatch.setenv("VAULT_PASSWORD", "testpass")
     monkeypatch.setattr(vault, "get_vault_password", lambda: "testpass")
+    # Tests swap vault.VaultLib; never hand them a VaultLib cached by another test
+    vault.clear_vault_password_cache()
+    yield
+    vault.clear_vault_password_cache()
+
+@pytest.fixture
+def real_vault_password(monkeypatch):
+    """Put back the real get_vault_password over the autouse stub."""
+    monkeypatch.setattr(vault, "get_vault_password", _real_get_vault_password)
+
+@pytest.fixture(scope="session", autouse=True)
+def log_dir(tmp_path_factory):
+    """Swap the stordb.log/vault.log handlers for files under a temp dir.
+
+    The module handlers would otherwise write into the working directory.
+    """
+    path = tmp_path_factory.mktemp("logs")
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
+    with pytest.MonkeyPatch.context() as mp:
+        for logger_obj, name in ((stordb.logger, "stordb.log"), (vault.vault_logger, "vault.log")):
+            handler = logging.FileHandler(path / name, delay=True)
+            handler.setFormatter(formatter)
+            mp.setattr(logger_obj, "handlers", [handler])
+        yield path
+        for logger_obj in (stordb.logger, vault.vault_logger):
+            for handler in logger_obj.handlers:
+                handler.close()
+
+@pytest.fixture(scope="session")
+def buffered_logger(log_dir):
+    """Collect stordb and vault log records in memory for the whole session.
+
+    The handler never flushes (flushLevel is above CRITICAL), so tests clear
+    handler.buffer first and then inspect the LogRecords there.
+    """
+    handler = logging.handlers.MemoryHandler(
+        capacity=1 << 20, flushLevel=logging.CRITICAL + 1, target=logging.NullHandler()
+    )
+    for logger_obj in (stordb.logger, vault.vault_logger):
+        logger_obj.addHandler(handler)
+    yield handler
+    for logger_obj in (stordb.logger, vault.vault_logger):
+        logger_obj.removeHandler(handler)
+
+@pytest.fixture(scope="session")
+def db_path(tmp_path_factory):
+    """One SQLite file per pytest-xdist worker ("master" when not distributed);
+    stordb connects to it in WAL mode with synchronous=NORMAL and temp_store=MEMORY."""
+    worker_id = os.environ.get("PYTEST_XDIST_WORKER", "master")
+    path = tmp_path_factory.mktemp(worker_id) / "test.sqlite"
+    stordb.init_db(str(path))
+    return path
+
+@pytest.fixture(autouse=True)
+def isolated_db_env(db_path, monkeypatch):
+    """Point STORDB_DB_PATH at this worker's database; undone after each test."""
+    monkeypatch.setenv("STORDB_DB_PATH", str(db_path))
+
+@pytest.fixture(scope="session")
+def db_template():
+    """An initialised in-memory database that each clean_db is copied from."""
+    template = stordb._connect(":memory:")
+    template.executescript(stordb.SCHEMA)
+    yield template
+    template.close()
+
+@pytest.fixture
+def clean_db(db_path, db_template, monkeypatch):
+    """Serve the worker database path from a fresh in-memory copy of the template.
+
+    stordb shares connections through _conn_cache, so every stordb call in the
+    test touches only memory; the file at db_path is left as initialised.
+    """
+    conn = stordb._connect(":memory:")
+    db_template.backup(conn)
+    monkeypatch.setitem(stordb._conn_cache, str(db_path), conn)
+    # The copy already has the schema; restore init_db's guard with the cache
+    monkeypatch.setitem(stordb._inited_conns, str(db_path), conn)
+    yield db_path
+    conn.close()
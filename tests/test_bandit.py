@@ -13,7 +13,6 @@ def test_bandit_detects_insecure_code():
 def run():
     exec("print('hello')")
 """
-    import time
     temp_fd, temp_path = tempfile.mkstemp(suffix=".py")
     with os.fdopen(temp_fd, "w") as f:
         f.write(insecure_code)
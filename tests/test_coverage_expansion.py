@@ -3,15 +3,13 @@ test_coverage_expansion.py - Additional tests for vault, update/delete, redactio
 """
 import os
 import tempfile
+from unittest.mock import MagicMock
 import pytest
 import stordb
 import vault
 
 # --- Vault export/import logic ---
-def test_vault_export_import(tmp_path, monkeypatch):
-    db_path = tmp_path / "test.sqlite"
-    os.environ["STORDB_DB_PATH"] = str(db_path)
-    stordb.init_db()
+def test_vault_export_import(clean_db, tmp_path, monkeypatch):
     stordb.add_secret("00:11:22:33:44:55", "Router", "Alice", "Main router", secret_value="secret1")
     vault_file = tmp_path / "vault.ansible"
     monkeypatch.setattr(vault, "get_vault_password", lambda: "testpass")
@@ -23,10 +21,7 @@ def test_vault_export_import(tmp_path, monkeypatch):
     assert decrypted is not None
 
 # --- Update/delete scenarios ---
-def test_update_delete_secret(tmp_path):
-    db_path = tmp_path / "test.sqlite"
-    os.environ["STORDB_DB_PATH"] = str(db_path)
-    stordb.init_db()
+def test_update_delete_secret(clean_db):
     stordb.add_secret("00:11:22:33:44:55", "Router", "Alice", "Main router")
     result = stordb.lookup_secret(mac_address="00:11:22:33:44:55")
     id = result["id"]
@@ -38,10 +33,7 @@ def test_update_delete_secret(tmp_path):
     assert deleted is None
 
 # --- Redaction logic for logs and CLI output ---
-def test_redaction_logic(tmp_path):
-    db_path = tmp_path / "test.sqlite"
-    os.environ["STORDB_DB_PATH"] = str(db_path)
-    stordb.init_db()
+def test_redaction_logic(clean_db):
     stordb.add_secret("00:11:22:33:44:55", "Router", "Alice", "Main router", secret_value="supersecret")
     result = stordb.lookup_secret(mac_address="00:11:22:33:44:55")
     safe_result = dict(result)
@@ -53,10 +45,7 @@ def test_redaction_logic(tmp_path):
     assert safe_result["secret_value"] == "[REDACTED]"
 
 # --- Simulate full CLI workflows ---
-def test_full_cli_workflow(tmp_path, monkeypatch):
-    db_path = tmp_path / "test.sqlite"
-    os.environ["STORDB_DB_PATH"] = str(db_path)
-    stordb.init_db()
+def test_full_cli_workflow(clean_db, tmp_path, monkeypatch):
     monkeypatch.setattr(vault, "get_vault_password", lambda: "testpass")
     stordb.add_secret("AA:BB:CC:DD:EE:01", "Router", "Alice", "Main router", secret_value="secret1")
     stordb.add_secret("AA:BB:CC:DD:EE:02", "Switch", "Bob", "Core switch", secret_value="secret2")
@@ -95,14 +84,36 @@ def test_vault_password_missing(monkeypatch, tmp_path):
     with pytest.raises(Exception):
         vault.vault_decrypt(vault_path=str(vault_file))
 
+def test_vault_password_cached(monkeypatch, real_vault_password):
+    monkeypatch.setattr(vault, "VAULT_PASSWORD", "envpass")
+    vault.clear_vault_password_cache()
+    assert vault.get_vault_password() == "envpass"
+    monkeypatch.setattr(vault, "VAULT_PASSWORD", "changed")
+    assert vault.get_vault_password() == "envpass"
+    vault.clear_vault_password_cache()
+    assert vault.get_vault_password() == "changed"
+
+def test_vaultlib_pool_reuse():
+    lib = vault._get_vaultlib("testpass")
+    assert vault._get_vaultlib("testpass") is lib
+    assert vault._get_vaultlib("otherpass") is not lib
+    for i in range(vault._VAULTLIB_POOL_SIZE):
+        vault._get_vaultlib(f"pass{i}")
+    assert len(vault._vaultlib_pool) == vault._VAULTLIB_POOL_SIZE
+    assert vault._get_vaultlib("testpass") is not lib
+    lib = vault._get_vaultlib("testpass")
+    vault.clear_vault_password_cache()
+    assert vault._get_vaultlib("testpass") is not lib
+
 # --- Import/export when disk is full or files are locked ---
 def test_import_export_disk_full(monkeypatch, tmp_path):
-    # Simulate disk full by raising OSError on file write
-    monkeypatch.setattr("builtins.open", lambda *a, **k: (_ for _ in ()).throw(OSError("No space left on device")))
+    # Simulate disk full by raising OSError when the output file is opened
+    monkeypatch.setattr(os, "open", MagicMock(side_effect=OSError("No space left on device")))
     with pytest.raises(OSError):
-        stordb.export_db_to_json("/tmp/full.json")
+        stordb.export_db_to_json(str(tmp_path / "full.json"))
     with pytest.raises(OSError):
-        vault.vault_encrypt(b"data", vault_path="/tmp/full.vault")
+        vault.vault_encrypt(b"data", vault_path=str(tmp_path / "full.vault"))
+    assert list(tmp_path.iterdir()) == []
 
 # --- Directly test vault_encrypt and vault_decrypt ---
 def test_vault_encrypt_decrypt_valid(monkeypatch, tmp_path):
@@ -117,11 +128,16 @@ def test_vault_encrypt_decrypt_invalid(monkeypatch, tmp_path):
     monkeypatch.setattr(vault, "get_vault_password", lambda: "testpass")
     vault.vault_encrypt(b"hello world", vault_path=str(vault_file))
     # Corrupt the vault file
-    with open(vault_file, "wb") as f:
-        f.write(b"not a vault")
+    vault_file.write_bytes(b"not a vault")
     with pytest.raises(vault.VaultError):
         vault.vault_decrypt(vault_path=str(vault_file))
 
+def test_vault_encrypt_decrypt_many(monkeypatch, tmp_path):
+    monkeypatch.setattr(vault, "get_vault_password", lambda: "testpass")
+    paths = [str(tmp_path / "one.ansible"), str(tmp_path / "two.ansible")]
+    vault.vault_encrypt_many([(b"first", paths[0]), (b"second", paths[1])])
+    assert vault.vault_decrypt_many(paths) == [b"first", b"second"]
+
 # --- Test VaultError exception handling ---
 def test_vault_error_exception():
     err = vault.VaultError("fail")
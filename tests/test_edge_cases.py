@@ -1,15 +1,13 @@
 """
 test_edge_cases.py - Edge case tests for stordb
 """
-import os
 import tempfile
+import json
+import sqlite3
 import pytest
 import stordb
 
-def test_add_missing_fields(tmp_path):
-    db_path = tmp_path / "test.sqlite"
-    os.environ["STORDB_DB_PATH"] = str(db_path)
-    stordb.init_db()
+def test_add_missing_fields(clean_db):
     # Missing mac_address
     with pytest.raises(Exception):
         stordb.add_secret("", "Router", "Alice", "Main router")
@@ -20,28 +18,19 @@ def test_add_missing_fields(tmp_path):
     with pytest.raises(Exception):
         stordb.add_secret("00:11:22:33:44:55", "Router", "", "Main router")
 
-def test_import_malformed_json(tmp_path):
-    db_path = tmp_path / "test.sqlite"
-    os.environ["STORDB_DB_PATH"] = str(db_path)
-    stordb.init_db()
+def test_import_malformed_json(clean_db, tmp_path):
     bad_json = tmp_path / "bad.json"
     bad_json.write_text("not a json")
     # Should print error and not raise
     stordb.import_json(str(bad_json))
 
-def test_update_delete_nonexistent(tmp_path):
-    db_path = tmp_path / "test.sqlite"
-    os.environ["STORDB_DB_PATH"] = str(db_path)
-    stordb.init_db()
+def test_update_delete_nonexistent(clean_db):
     # Update non-existent
     stordb.update_secret(9999, {"owner": "Nobody"})
     # Delete non-existent
     stordb.delete_secret(9999)
 
-def test_redaction_logic(tmp_path):
-    db_path = tmp_path / "test.sqlite"
-    os.environ["STORDB_DB_PATH"] = str(db_path)
-    stordb.init_db()
+def test_redaction_logic(clean_db):
     stordb.add_secret("00:11:22:33:44:55", "Router", "Alice", "Main router", secret_value="supersecret")
     result = stordb.lookup_secret(mac_address="00:11:22:33:44:55")
     assert result["mac_address"] == "00:11:22:33:44:55"
@@ -53,3 +42,131 @@ def test_redaction_logic(tmp_path):
         safe_result["mac_address"] = "[REDACTED]"
     assert safe_result["mac_address"] == "[REDACTED]"
     assert safe_result["secret_value"] == "[REDACTED]"
+
+def test_import_json_empty_required_field(clean_db, tmp_path):
+    data = [
+        {"mac_address": "00:11:22:33:44:55", "device_name": "Router", "owner": "Alice"},
+        {"mac_address": "", "device_name": "Switch", "owner": "Bob"},
+    ]
+    json_file = tmp_path / "data.json"
+    json_file.write_text(json.dumps(data))
+    # Validation rejects the whole file before anything is inserted
+    stordb.import_json(str(json_file))
+    assert stordb.lookup_secret(mac_address="00:11:22:33:44:55") is None
+
+def test_lookup_by_unsupported_field(clean_db):
+    with pytest.raises(ValueError):
+        stordb.lookup_secrets_by_field("secret_value = secret_value OR 1", "x")
+
+def test_update_unsupported_field(clean_db):
+    stordb.add_secret("00:11:22:33:44:55", "Router", "Alice", "Main router")
+    with pytest.raises(ValueError):
+        stordb.update_secret(1, {"owner = 'x', notes": "y"})
+    assert stordb.lookup_secret(mac_address="00:11:22:33:44:55")["owner"] == "Alice"
+
+def test_import_db_from_json_reports_rejected_record(clean_db, tmp_path):
+    data = [
+        {"mac_address": "00:11:22:33:44:55", "device_name": "Router", "owner": "Alice"},
+        {"mac_address": "00:11:22:33:44:66", "device_name": "Switch"},
+    ]
+    json_file = tmp_path / "data.json"
+    json_file.write_text(json.dumps(data))
+    with pytest.raises(ValueError, match="Record 1"):
+        stordb.import_db_from_json(str(json_file))
+    assert stordb.lookup_secret(mac_address="00:11:22:33:44:55") is None
+
+class FakeIjson:
+    """Stand-in for ijson.items that parses the whole file but yields lazily."""
+    calls = []
+
+    @classmethod
+    def items(cls, f, prefix, use_float=False):
+        cls.calls.append((prefix, use_float))
+        yield from json.load(f)
+
+def test_import_json_streaming_validates_each_record(clean_db, tmp_path, monkeypatch, capsys):
+    FakeIjson.calls.clear()
+    monkeypatch.setattr(stordb, "ijson", FakeIjson)
+    json_file = tmp_path / "data.json"
+    json_file.write_text(json.dumps([
+        {"mac_address": "00:11:22:33:44:55", "device_name": "Router", "owner": "Alice"},
+        "not an object",
+    ]))
+    stordb.import_json(str(json_file))
+    assert FakeIjson.calls == [("item", True)]
+    assert "Record 1 is not a JSON object." in capsys.readouterr().out
+    assert stordb.lookup_secret(mac_address="00:11:22:33:44:55") is None
+    json_file.write_text(json.dumps([
+        {"mac_address": "00:11:22:33:44:55", "device_name": "Router", "owner": "Alice"},
+        {"mac_address": "00:11:22:33:44:66", "device_name": "Switch"},
+    ]))
+    stordb.import_json(str(json_file))
+    assert "Record 1 missing required fields: owner" in capsys.readouterr().out
+    assert stordb.lookup_secret(mac_address="00:11:22:33:44:55") is None
+    json_file.write_text(json.dumps([
+        {"mac_address": "00:11:22:33:44:55", "device_name": "Router", "owner": "Alice", "notes": "n"},
+    ]))
+    stordb.import_json(str(json_file))
+    assert stordb.lookup_secret(mac_address="00:11:22:33:44:55")["notes"] == "n"
+
+def test_import_json_streaming_rolls_back_truncated_file(clean_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(stordb, "ijson", pytest.importorskip("ijson"))
+    json_file = tmp_path / "data.json"
+    json_file.write_text(
+        '  [{"mac_address": "00:11:22:33:44:55", "device_name": "Router", "owner": "Alice"},'
+        ' {"mac_address": "00:11:22:33:44:66", "device_name": "Sw'
+    )
+    stordb.import_json(str(json_file))
+    assert stordb.lookup_secret(mac_address="00:11:22:33:44:55") is None
+    json_file.write_text(json.dumps([{"mac_address": "00:11:22:33:44:55", "device_name": "Router", "owner": "Alice"}]))
+    stordb.import_json(str(json_file))
+    assert stordb.lookup_secret(mac_address="00:11:22:33:44:55")["owner"] == "Alice"
+
+LEGACY_SCHEMA = """
+CREATE TABLE secrets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    mac_address TEXT,
+    device_name TEXT,
+    owner TEXT,
+    notes TEXT,
+    secret_type TEXT,
+    secret_value TEXT
+);
+"""
+
+@pytest.mark.parametrize("record", [
+    {"mac_address": "aa", "device_name": "x"},
+    {"device_name": "", "owner": "o"},
+    {"foo": 1},
+])
+def test_import_db_from_json_rejects_missing_fields_on_legacy_schema(tmp_path, monkeypatch, record):
+    # Tables created before the NOT NULL/CHECK constraints keep their old definition
+    db_path = tmp_path / "legacy.sqlite"
+    legacy = sqlite3.connect(db_path)
+    legacy.executescript(LEGACY_SCHEMA)
+    legacy.close()
+    monkeypatch.setenv("STORDB_DB_PATH", str(db_path))
+    stordb.init_db()
+    json_file = tmp_path / "data.json"
+    json_file.write_text(json.dumps([record]))
+    with pytest.raises(ValueError, match="Record 0"):
+        stordb.import_db_from_json(str(json_file))
+    stordb.import_json(str(json_file))
+    count = stordb.get_db_connection().execute("SELECT count(*) FROM secrets").fetchone()[0]
+    stordb.close_db_connection()
+    assert count == 0
+
+def test_add_secrets_rejects_missing_fields_on_legacy_schema(tmp_path):
+    db_path = str(tmp_path / "legacy.sqlite")
+    legacy = sqlite3.connect(db_path)
+    legacy.executescript(LEGACY_SCHEMA)
+    legacy.close()
+    rows = [
+        ("aa", "Router", "Alice", "", "mac", ""),
+        ("bb", "", "Bob", "", "mac", ""),
+    ]
+    with pytest.raises(ValueError, match="Record 1 missing required fields: device_name"):
+        stordb.add_secrets(rows, db_path=db_path)
+    count = stordb.get_db_connection(db_path).execute("SELECT count(*) FROM secrets").fetchone()[0]
+    stordb.close_db_connection(db_path)
+    assert count == 0
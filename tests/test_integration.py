@@ -1,42 +1,30 @@
 """
 test_integration.py - Integration tests for stordb full workflow
 """
-import os
 import tempfile
 import json
 import stordb
+import vault
 
-def test_full_workflow(tmp_path):
-    import vault
-    db_path = tmp_path / "test.sqlite"
-    os.environ["STORDB_DB_PATH"] = str(db_path)
-    stordb.init_db()
+def test_full_workflow(clean_db, tmp_path):
     # Mock vault password provider
     vault.get_vault_password = lambda: "testpass"
     # Add device
-    stordb.add_secret("AA:BB:CC:DD:EE:01", "Router", "Alice", "Main router", secret_value="secret1")
-    stordb.add_secret("AA:BB:CC:DD:EE:02", "Switch", "Bob", "Core switch", secret_value="secret2")
+    stordb.add_secrets([
+        ("AA:BB:CC:DD:EE:01", "Router", "Alice", "Main router", "mac", "secret1"),
+        ("AA:BB:CC:DD:EE:02", "Switch", "Bob", "Core switch", "mac", "secret2"),
+    ])
     # Export to JSON
     json_file = tmp_path / "export.json"
     stordb.export_db_to_json(str(json_file))
     data = json.loads(json_file.read_text())
     assert len(data) == 2
-    # Export to vault (simulate)
+    # Export to vault (in-process Ansible vault encryption)
     vault_file = tmp_path / "vault.ansible"
-    # Monkeypatch subprocess to simulate vault
-    class DummyProc:
-        def __init__(self, returncode=0, stdout=b"[{}]", stderr=b""):
-            self.returncode = returncode
-            self.stdout = stdout
-            self.stderr = stderr
-        def run(self, *args, **kwargs):
-            open(vault_file, "w").write("dummy vault content")
-            return self
-    stordb.subprocess = DummyProc()
     stordb.export_db_to_vault(str(vault_file))
     assert vault_file.exists()
-    # Import from vault (simulate)
-    stordb.subprocess = DummyProc(stdout=json_file.read_bytes())
+    assert vault_file.read_bytes().startswith(b"$ANSIBLE_VAULT;1.1;AES256")
+    # Import from vault
     stordb.import_db_from_vault(str(vault_file))
     # Lookup and verify redaction
     results = stordb.lookup_secrets_by_field("owner", "Alice")
@@ -1,90 +1,67 @@
 """
 test_logging.py - Tests for logging in stordb.py and vault.py
 """
+import io
 import os
-import logging
+import re
 import tempfile
 import stordb
 import vault
 import pytest
 
-def read_log(log_path):
-    with open(log_path, "r") as f:
-        return f.read()
+ADD_PATTERNS = re.compile(r"DB TRANSACTION: add_secret|device_name='dev1'|owner='owner1'|\[REDACTED\]")
+UPDATE_PATTERNS = re.compile(r"DB TRANSACTION: update_secret|\bid=1\b|\[REDACTED\]")
+DELETE_PATTERNS = re.compile(r"DB TRANSACTION: delete_secret|\bid=1\b")
 
-def test_stordb_add_secret_logs(tmp_path, monkeypatch):
-    log_path = tmp_path / "stordb.log"
-    monkeypatch.setenv("STORDB_DB_PATH", str(tmp_path / "test.sqlite"))
-    monkeypatch.setattr(stordb, "logger", logging.getLogger("stordb_test"))
-    stordb.logger.handlers.clear()
-    handler = logging.FileHandler(str(log_path))
-    stordb.logger.addHandler(handler)
-    stordb.logger.setLevel(logging.INFO)
-    stordb.init_db()
+def logged_messages(handler):
+    return "\n".join(record.getMessage() for record in handler.buffer)
+
+def test_stordb_add_secret_logs(clean_db, buffered_logger):
+    buffered_logger.buffer.clear()
     stordb.add_secret("mac1", "dev1", "owner1")
-    handler.flush()
-    log_content = read_log(log_path)
-    assert "DB TRANSACTION: add_secret" in log_content
-    assert "device_name='dev1'" in log_content
-    assert "owner='owner1'" in log_content
-    assert "[REDACTED]" in log_content
+    log_content = logged_messages(buffered_logger)
+    assert set(ADD_PATTERNS.findall(log_content)) == {
+        "DB TRANSACTION: add_secret", "device_name='dev1'", "owner='owner1'", "[REDACTED]"
+    }
     assert "mac1" not in log_content
 
-def test_stordb_update_secret_logs(tmp_path, monkeypatch):
-    log_path = tmp_path / "stordb.log"
-    monkeypatch.setenv("STORDB_DB_PATH", str(tmp_path / "test.sqlite"))
-    monkeypatch.setattr(stordb, "logger", logging.getLogger("stordb_test"))
-    stordb.logger.handlers.clear()
-    handler = logging.FileHandler(str(log_path))
-    stordb.logger.addHandler(handler)
-    stordb.logger.setLevel(logging.INFO)
-    stordb.init_db()
+def test_stordb_update_secret_logs(clean_db, buffered_logger):
+    buffered_logger.buffer.clear()
     stordb.add_secret("mac2", "dev2", "owner2")
     stordb.update_secret(1, {"owner": "newowner", "secret_value": "supersecret"})
-    handler.flush()
-    log_content = read_log(log_path)
-    assert "DB TRANSACTION: update_secret" in log_content
-    assert "id=1" in log_content
-    assert "[REDACTED]" in log_content
+    log_content = logged_messages(buffered_logger)
+    assert set(UPDATE_PATTERNS.findall(log_content)) == {"DB TRANSACTION: update_secret", "id=1", "[REDACTED]"}
     assert "supersecret" not in log_content
 
-def test_stordb_delete_secret_logs(tmp_path, monkeypatch):
-    log_path = tmp_path / "stordb.log"
-    monkeypatch.setenv("STORDB_DB_PATH", str(tmp_path / "test.sqlite"))
-    monkeypatch.setattr(stordb, "logger", logging.getLogger("stordb_test"))
-    stordb.logger.handlers.clear()
-    handler = logging.FileHandler(str(log_path))
-    stordb.logger.addHandler(handler)
-    stordb.logger.setLevel(logging.INFO)
-    stordb.init_db()
+def test_stordb_delete_secret_logs(clean_db, buffered_logger):
+    buffered_logger.buffer.clear()
     stordb.add_secret("mac3", "dev3", "owner3")
     stordb.delete_secret(1)
-    handler.flush()
-    log_content = read_log(log_path)
-    assert "DB TRANSACTION: delete_secret" in log_content
-    assert "id=1" in log_content
+    log_content = logged_messages(buffered_logger)
+    assert set(DELETE_PATTERNS.findall(log_content)) == {"DB TRANSACTION: delete_secret", "id=1"}
     assert "mac3" not in log_content
 
-def test_vault_encrypt_decrypt_logs(tmp_path, monkeypatch):
-    log_path = tmp_path / "vault.log"
+def test_vault_encrypt_decrypt_logs(monkeypatch, buffered_logger):
     monkeypatch.setenv("VAULT_PASSWORD", "testpass")
-    monkeypatch.setattr(vault, "vault_logger", logging.getLogger("vault_test"))
-    vault.vault_logger.handlers.clear()
-    handler = logging.FileHandler(str(log_path))
-    vault.vault_logger.addHandler(handler)
-    vault.vault_logger.setLevel(logging.INFO)
+    buffered_logger.buffer.clear()
     data = b"secretdata"
-    vault_path = tmp_path / "vault.ansible"
-    vault.vault_encrypt(data, str(vault_path))
-    handler.flush()
-    log_content = read_log(log_path)
+    buf = io.BytesIO()
+    vault.vault_encrypt(data, buf)
+    log_content = logged_messages(buffered_logger)
     assert "Vault encrypt requested" in log_content
     assert "Vault encryption complete" in log_content
     assert "secretdata" not in log_content
     # Decrypt
-    vault.vault_decrypt(str(vault_path))
-    handler.flush()
-    log_content = read_log(log_path)
+    buf.seek(0)
+    assert vault.vault_decrypt(buf) == data
+    log_content = logged_messages(buffered_logger)
     assert "Vault decrypt requested" in log_content
     assert "Vault decryption complete" in log_content
+    assert "<file object>" in log_content
+    assert "BytesIO object at" not in log_content
     assert "secretdata" not in log_content
+
+def test_setup_logger_is_idempotent():
+    logger = stordb.setup_logger(debug=False)
+    handlers = list(logger.handlers)
+    assert stordb.setup_logger(debug=False).handlers == handlers
@@ -1,15 +1,14 @@
 """
 test_stordb.py - Initial tests for stordb
 """
-import os
 import tempfile
 import sqlite3
 import pytest
 import stordb
 
-def test_init_db(tmp_path):
+def test_init_db(tmp_path, monkeypatch):
     db_path = tmp_path / "test.sqlite"
-    os.environ["STORDB_DB_PATH"] = str(db_path)
+    monkeypatch.setenv("STORDB_DB_PATH", str(db_path))
     stordb.init_db()
     assert db_path.exists()
     # Check table exists
@@ -18,20 +17,14 @@ def test_init_db(tmp_path):
     assert cursor.fetchone() is not None
     conn.close()
 
-def test_add_and_lookup(tmp_path):
-    db_path = tmp_path / "test.sqlite"
-    os.environ["STORDB_DB_PATH"] = str(db_path)
-    stordb.init_db()
+def test_add_and_lookup(clean_db):
     stordb.add_secret("00:11:22:33:44:55", "Router", "Alice", "Main router")
     result = stordb.lookup_secret(mac_address="00:11:22:33:44:55")
     assert result is not None
     assert result["device_name"] == "Router"
     assert result["owner"] == "Alice"
 
-def test_update_and_delete(tmp_path):
-    db_path = tmp_path / "test.sqlite"
-    os.environ["STORDB_DB_PATH"] = str(db_path)
-    stordb.init_db()
+def test_update_and_delete(clean_db):
     stordb.add_secret("00:11:22:33:44:55", "Router", "Alice", "Main router")
     result = stordb.lookup_secret(mac_address="00:11:22:33:44:55")
     id = result["id"]
@@ -41,3 +34,103 @@ def test_update_and_delete(tmp_path):
     stordb.delete_secret(id)
     deleted = stordb.lookup_secret(mac_address="00:11:22:33:44:55")
     assert deleted is None
+
+def test_db_connection_uses_wal(tmp_path, monkeypatch):
+    db_path = tmp_path / "test.sqlite"
+    monkeypatch.setenv("STORDB_DB_PATH", str(db_path))
+    stordb.init_db()
+    conn = sqlite3.connect(db_path)
+    mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    conn.close()
+    assert mode == "wal"
+
+def test_db_connection_is_reused(tmp_path):
+    db_path = str(tmp_path / "test.sqlite")
+    conn = stordb.get_db_connection(db_path)
+    assert stordb.get_db_connection(db_path) is conn
+    stordb.close_db_connection(db_path)
+    assert stordb.get_db_connection(db_path) is not conn
+    stordb.close_db_connection(db_path)
+
+def test_init_db_creates_indexes(tmp_path, monkeypatch):
+    db_path = tmp_path / "test.sqlite"
+    monkeypatch.setenv("STORDB_DB_PATH", str(db_path))
+    stordb.init_db()
+    conn = sqlite3.connect(db_path)
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    conn.close()
+    assert {"idx_secrets_mac", "idx_secrets_device", "idx_secrets_owner"} <= names
+
+def test_backup_and_restore(clean_db, tmp_path):
+    stordb.add_secret("00:11:22:33:44:55", "Router", "Alice", "Main router")
+    backup_path = tmp_path / "backup.sqlite"
+    stordb.backup_db(str(backup_path))
+    assert backup_path.exists()
+    stordb.delete_secret(stordb.lookup_secret(mac_address="00:11:22:33:44:55")["id"])
+    stordb.restore_db(str(backup_path))
+    restored = stordb.lookup_secret(mac_address="00:11:22:33:44:55")
+    assert restored["device_name"] == "Router"
+
+def test_lookup_secrets_union(clean_db):
+    stordb.add_secret("00:11:22:33:44:55", "Router", "Alice", "Main router")
+    stordb.add_secret("00:11:22:33:44:66", "Switch", "Bob", "Core switch")
+    stordb.add_secret("00:11:22:33:44:77", "AP", "Carol", "Access point")
+    results = stordb.lookup_secrets(mac_address="00:11:22:33:44:55", owner="Alice", device_name="Switch")
+    assert [r["device_name"] for r in results] == ["Router", "Switch"]
+    assert stordb.lookup_secrets() == []
+
+def test_export_db_to_json_owner_only(clean_db, tmp_path):
+    stordb.add_secret("00:11:22:33:44:55", "Router", "Alice", "Main router", secret_value="secret1")
+    json_file = tmp_path / "export.json"
+    stordb.export_db_to_json(str(json_file))
+    assert oct(json_file.stat().st_mode & 0o777) == oct(0o600)
+
+def test_add_secrets_rolls_back_batch(clean_db):
+    count = stordb.add_secrets([
+        ("00:11:22:33:44:55", "Router", "Alice", "", "mac", ""),
+        ("00:11:22:33:44:66", "Switch", "Bob", "", "mac", ""),
+    ])
+    assert count == 2
+    with pytest.raises(ValueError, match="Record 1 missing required fields: device_name"):
+        stordb.add_secrets([
+            ("00:11:22:33:44:77", "AP", "Carol", "", "mac", ""),
+            ("00:11:22:33:44:88", "", "Dave", "", "mac", ""),
+        ])
+    assert stordb.lookup_secret(mac_address="00:11:22:33:44:77") is None
+
+def test_init_db_rechecks_schema_after_close_and_restore(tmp_path):
+    db_path = str(tmp_path / "test.sqlite")
+    stordb.init_db(db_path)
+    stordb.get_db_connection(db_path).execute("DROP TABLE secrets")
+    stordb.close_db_connection(db_path)
+    # A reopened connection runs the schema script again
+    stordb.init_db(db_path)
+    assert stordb.get_db_connection(db_path).execute(
+        "SELECT name FROM sqlite_master WHERE name='secrets'"
+    ).fetchone() is not None
+    # Restoring a backup without indexes, then init_db, recreates them
+    backup_path = tmp_path / "bare.sqlite"
+    bare = sqlite3.connect(backup_path)
+    bare.execute("CREATE TABLE secrets (id INTEGER PRIMARY KEY, mac_address TEXT, device_name TEXT, owner TEXT, notes TEXT, secret_type TEXT, secret_value TEXT)")
+    bare.commit()
+    bare.close()
+    stordb.restore_db(str(backup_path), db_path=db_path)
+    stordb.init_db(db_path)
+    names = {row[0] for row in stordb.get_db_connection(db_path).execute(
+        "SELECT name FROM sqlite_master WHERE type='index'"
+    )}
+    stordb.close_db_connection(db_path)
+    assert {"idx_secrets_mac", "idx_secrets_device", "idx_secrets_owner"} <= names
+
+def test_add_secrets_refuses_open_transaction(clean_db, buffered_logger):
+    conn = stordb.get_db_connection()
+    conn.execute("BEGIN")
+    conn.execute(stordb._INSERT_SECRET_SQL, ("00:11:22:33:44:55", "Router", "Alice", "", "mac", ""))
+    buffered_logger.buffer.clear()
+    with pytest.raises(sqlite3.OperationalError, match="no open transaction"):
+        stordb.add_secrets([("00:11:22:33:44:66", "Switch", "Bob", "", "mac", "")], conn=conn)
+    assert any("DB TRANSACTION ERROR: add_secrets" in r.getMessage() for r in buffered_logger.buffer)
+    # The caller's transaction is left open and untouched
+    assert conn.in_transaction
+    conn.commit()
+    assert stordb.lookup_secret(mac_address="00:11:22:33:44:55") is not None
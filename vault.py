@@ -3,10 +3,18 @@ vault.py - Ansible vault integration for stordb
 """
 
 import os
+import atexit
 import logging
-from typing import Optional
-from ansible.parsing.vault import VaultLib, VaultSecret
-from ansible.constants import DEFAULT_VAULT_ID_MATCH
+import logging.handlers
+import hashlib
+import queue
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+
+# Ansible's vault API is imported on first use (see _load_ansible_vault); the
+# names stay module attributes so tests can monkeypatch them
+VaultLib = None
+VaultSecret = None
+DEFAULT_VAULT_ID_MATCH = None
 
 VAULT_PATH = os.getenv("STORDB_VAULT_PATH", "vault.ansible")
 VAULT_PASSWORD = os.getenv("VAULT_PASSWORD")
@@ -14,44 +22,167 @@ VAULT_PASSWORD = os.getenv("VAULT_PASSWORD")
 # Setup logger for vault operations
 vault_logger = logging.getLogger("vault")
 vault_logger.setLevel(logging.INFO)
+_log_listener = None
+
+def _start_log_listener() -> None:
+    """Feed vault_logger through a QueueHandler to a rotating vault.log on a listener thread."""
+    global _log_listener
+    file_handler = logging.handlers.RotatingFileHandler(
+        "vault.log", maxBytes=4 << 20, backupCount=2, delay=True
+    )
+    file_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    log_queue = queue.SimpleQueue()
+    _log_listener = logging.handlers.QueueListener(log_queue, file_handler)
+    _log_listener.start()
+    vault_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+def _stop_log_listener() -> None:
+    """Flush and stop the log listener thread, closing its file handler."""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        for handler in _log_listener.handlers:
+            handler.close()
+        _log_listener = None
+
 if not vault_logger.handlers:
-    handler = logging.FileHandler("vault.log")
-    formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
-    handler.setFormatter(formatter)
-    vault_logger.addHandler(handler)
+    _start_log_listener()
+atexit.register(_stop_log_listener)
 
 class VaultError(Exception):
     pass
 
+# Password resolved by the first get_vault_password call, reused afterwards
+_cached_password: Optional[str] = None
+
+# Most recently used VaultLib instances, keyed by a short digest of their
+# password; the least recently used is evicted past _VAULTLIB_POOL_SIZE
+_VAULTLIB_POOL_SIZE = 4
+_vaultlib_pool: Dict[bytes, "VaultLib"] = {}
+
 def get_vault_password() -> str:
+    global _cached_password
+    if _cached_password is not None:
+        return _cached_password
     if VAULT_PASSWORD:
         vault_logger.info("Vault password retrieved from environment variable.")
-        return VAULT_PASSWORD
-    import getpass
-    vault_logger.info("Vault password requested interactively.")
-    return getpass.getpass("Vault password: ")
-
-def vault_encrypt(data: bytes, vault_path: str = VAULT_PATH) -> None:
-    vault_logger.info(f"Vault encrypt requested for data of length {len(data)} to {vault_path}")
-    password = get_vault_password()
-    secret = VaultSecret(password.encode())
-    vault = VaultLib([(DEFAULT_VAULT_ID_MATCH, secret)])
-    encrypted = vault.encrypt(data, secret)
-    with open(vault_path, "wb") as f:
+        password = VAULT_PASSWORD
+    else:
+        import getpass
+        vault_logger.info("Vault password requested interactively.")
+        password = getpass.getpass("Vault password: ")
+    if password:
+        _cached_password = password
+    return password
+
+def clear_vault_password_cache() -> None:
+    """Forget the cached password and every VaultLib built from a password."""
+    global _cached_password
+    _cached_password = None
+    _vaultlib_pool.clear()
+
+def _load_ansible_vault() -> None:
+    """Import the Ansible vault API, filling in any names not already set."""
+    global VaultLib, VaultSecret, DEFAULT_VAULT_ID_MATCH
+    if VaultLib is None or VaultSecret is None or DEFAULT_VAULT_ID_MATCH is None:
+        from ansible.parsing import vault as ansible_vault
+        from ansible import constants
+        if VaultLib is None:
+            VaultLib = ansible_vault.VaultLib
+        if VaultSecret is None:
+            VaultSecret = ansible_vault.VaultSecret
+        if DEFAULT_VAULT_ID_MATCH is None:
+            DEFAULT_VAULT_ID_MATCH = constants.DEFAULT_VAULT_ID_MATCH
+
+def _get_vaultlib(password: str) -> "VaultLib":
+    """Return the pooled VaultLib for password, building it on first use."""
+    secret = password.encode()
+    key = hashlib.blake2b(secret, digest_size=16).digest()
+    vault = _vaultlib_pool.pop(key, None)
+    if vault is None:
+        _load_ansible_vault()
+        vault = VaultLib([(DEFAULT_VAULT_ID_MATCH, VaultSecret(secret))])
+        if len(_vaultlib_pool) >= _VAULTLIB_POOL_SIZE:
+            del _vaultlib_pool[next(iter(_vaultlib_pool))]
+    # Reinsert so dict order runs from least to most recently used
+    _vaultlib_pool[key] = vault
+    return vault
+
+def _write_vault_file(vault_path: Union[str, BinaryIO], encrypted: bytes) -> None:
+    """Write vault ciphertext in one write, owner-only permissions on create.
+
+    A writable binary file object is written to directly instead of a path.
+    """
+    if hasattr(vault_path, "write"):
+        vault_path.write(encrypted)
+        return
+    fd = os.open(vault_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        f = open(fd, "wb")
+    except Exception:
+        os.close(fd)
+        raise
+    with f:
         f.write(encrypted)
-    vault_logger.info(f"Vault encryption complete for {vault_path}. No secrets logged.")
 
-def vault_decrypt(vault_path: str = VAULT_PATH) -> Optional[bytes]:
-    vault_logger.info(f"Vault decrypt requested for {vault_path}")
-    password = get_vault_password()
-    secret = VaultSecret(password.encode())
-    vault = VaultLib([(DEFAULT_VAULT_ID_MATCH, secret)])
+def _read_vault_file(vault_path: Union[str, BinaryIO]) -> bytes:
+    """Read vault ciphertext in one sized read from a path or binary file object.
+
+    VaultLib.decrypt only accepts str/bytes (mmap or memoryview objects are
+    rejected), so the ciphertext has to be materialized; a single read avoids
+    any extra copy beyond that.
+    """
+    if hasattr(vault_path, "read"):
+        return vault_path.read()
     with open(vault_path, "rb") as f:
-        encrypted_data = f.read()
+        return f.read()
+
+def _vault_label(vault_path: Union[str, BinaryIO]) -> str:
+    """Name vault_path in log messages: the path itself, or a file object's name."""
+    if hasattr(vault_path, "read") or hasattr(vault_path, "write"):
+        return str(getattr(vault_path, "name", "<file object>"))
+    return str(vault_path)
+
+def vault_encrypt(data: bytes, vault_path: Union[str, BinaryIO] = VAULT_PATH) -> None:
+    label = _vault_label(vault_path)
+    vault_logger.info(f"Vault encrypt requested for data of length {len(data)} to {label}")
+    vault = _get_vaultlib(get_vault_password())
+    encrypted = vault.encrypt(data)
+    _write_vault_file(vault_path, encrypted)
+    vault_logger.info(f"Vault encryption complete for {label}. No secrets logged.")
+
+def vault_encrypt_many(items: List[Tuple[bytes, str]]) -> None:
+    """Encrypt several (data, vault_path) pairs with one password lookup and VaultLib."""
+    vault_logger.info(f"Vault batch encrypt requested for {len(items)} files")
+    vault = _get_vaultlib(get_vault_password())
+    for data, vault_path in items:
+        _write_vault_file(vault_path, vault.encrypt(data))
+    vault_logger.info(f"Vault batch encryption complete for {len(items)} files. No secrets logged.")
+
+def vault_decrypt(vault_path: Union[str, BinaryIO] = VAULT_PATH) -> Optional[bytes]:
+    label = _vault_label(vault_path)
+    vault_logger.info(f"Vault decrypt requested for {label}")
+    vault = _get_vaultlib(get_vault_password())
+    encrypted_data = _read_vault_file(vault_path)
     try:
         decrypted = vault.decrypt(encrypted_data)
-        vault_logger.info(f"Vault decryption complete for {vault_path}. No secrets logged.")
+        vault_logger.info(f"Vault decryption complete for {label}. No secrets logged.")
         return decrypted
     except Exception as e:
-        vault_logger.error(f"Vault decryption error for {vault_path}: {e}")
+        vault_logger.error(f"Vault decryption error for {label}: {e}")
         raise VaultError(str(e))
+
+def vault_decrypt_many(vault_paths: List[str]) -> List[bytes]:
+    """Decrypt several vault files with one password lookup and VaultLib."""
+    vault_logger.info(f"Vault batch decrypt requested for {len(vault_paths)} files")
+    vault = _get_vaultlib(get_vault_password())
+    results = []
+    for vault_path in vault_paths:
+        encrypted_data = _read_vault_file(vault_path)
+        try:
+            results.append(vault.decrypt(encrypted_data))
+        except Exception as e:
+            vault_logger.error(f"Vault decryption error for {vault_path}: {e}")
+            raise VaultError(str(e))
+    vault_logger.info(f"Vault batch decryption complete for {len(vault_paths)} files. No secrets logged.")
+    return results